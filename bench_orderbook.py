@@ -0,0 +1,64 @@
+"""
+Per-event cost of the pure-Python OrderBook hot path.
+
+    python bench_orderbook.py [n_events]
+
+Replays seeded streams through orderbook.OrderBook and prints the best
+of three runs in µs/event:
+
+* add/cancel – adds within ±$1 of the first tick, cancels of random
+  live orders (most levels already exist, some empty out);
+* mixed      – the same plus in-place / moving replaces and partial or
+  full executions.
+"""
+import random
+import sys
+import time
+
+from orderbook import OrderBook, VENUES
+
+def add_cancel_stream(n, seed=1, mixed=False):
+    rng  = random.Random(seed)
+    live = []
+    out  = []
+    for k in range(n):
+        r = rng.random()
+        if live and r < 0.45:
+            out.append(("cancel", live.pop(rng.randrange(len(live)))))
+        elif mixed and live and r < 0.55:
+            oid = rng.choice(live)
+            out.append(("execute", oid, rng.randint(1, 150)))
+            live.remove(oid)                 # may be a partial fill: never reused
+        else:
+            side = rng.choice((b'BID', b'ASK'))
+            base = 2.40 if side == b'BID' else 2.60
+            px   = round(base + rng.choice((-1, 1)) * rng.randint(0, 100) * 0.01, 2)
+            evt  = (rng.choice(VENUES), side, px, rng.randint(1, 100))
+            if mixed and live and r < 0.70:
+                out.append(("replace", k, live.pop(rng.randrange(len(live)))) + evt)
+            else:
+                out.append(("add", k) + evt)
+            live.append(k)
+    return out
+
+def run(stream):
+    ob = OrderBook()
+    add, cancel = ob.on_add, ob.on_cancel
+    replace, execute = ob.on_replace, ob.on_execute
+    t0 = time.perf_counter()
+    for e in stream:
+        op = e[0]
+        if op == "add":       add(*e[1:])
+        elif op == "cancel":  cancel(e[1])
+        elif op == "replace": replace(*e[1:])
+        else:                 execute(*e[1:])
+    return time.perf_counter() - t0
+
+def main(n=200_000):
+    for name, mixed in (("add/cancel", False), ("mixed", True)):
+        stream = add_cancel_stream(n, mixed=mixed)
+        best = min(run(stream) for _ in range(5))
+        print(f"{name:<11} {n} events  {best / n * 1e6:6.2f} µs/event")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
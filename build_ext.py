@@ -0,0 +1,43 @@
+"""
+Build the ``pyorderbook`` pybind11 extension from orderbook.cpp, in place.
+
+    python build_ext.py
+
+orderbook2.py (and its tests) import the resulting pyorderbook*.so from
+this directory; orderbook2_test.py calls ``ensure()``, which rebuilds
+only when the .so is missing or older than orderbook.cpp.
+"""
+import os
+import sysconfig
+
+from pybind11.setup_helpers import Pybind11Extension, build_ext
+from setuptools import setup
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+ext = Pybind11Extension(
+    "pyorderbook", ["orderbook.cpp"],
+    cxx_std=17,
+    extra_compile_args=["-O2", "-pthread"],
+    extra_link_args=["-pthread"],
+)
+
+def build():
+    cwd = os.getcwd()
+    os.chdir(HERE)                            # sources & --inplace are relative
+    try:
+        setup(name="pyorderbook", ext_modules=[ext],
+              cmdclass={"build_ext": build_ext},
+              script_args=["-q", "build_ext", "--inplace",
+                           "--build-temp", os.path.join("build", "temp")])
+    finally:
+        os.chdir(cwd)
+
+def ensure():
+    so  = os.path.join(HERE, "pyorderbook" + sysconfig.get_config_var("EXT_SUFFIX"))
+    src = os.path.join(HERE, "orderbook.cpp")
+    if not os.path.exists(so) or os.path.getmtime(so) < os.path.getmtime(src):
+        build()
+
+if __name__ == "__main__":
+    build()
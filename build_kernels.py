@@ -0,0 +1,20 @@
+"""
+AOT-compile the DenseWindowSide kernels into ``orderbook_kernels``.
+
+    python build_kernels.py
+
+orderbook.py imports the compiled module when present, so neither numba
+nor any LLVM / JIT work is loaded at runtime; otherwise it falls back to
+the @njit(cache=True) kernels in orderbook_jit.
+"""
+from numba.pycc import CC
+
+import orderbook_jit as jit
+
+cc = CC('orderbook_kernels')
+
+cc.export('best_after_dec', 'i8(u8[:], b1, i8)')(jit.best_after_dec.py_func)
+cc.export('best_in_coarse', 'i8(u2[:], b1, i8)')(jit.best_in_coarse.py_func)
+
+if __name__ == "__main__":
+    cc.compile()
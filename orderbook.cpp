@@ -1,18 +1,39 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include <pybind11/numpy.h>
+#include <algorithm>
 #include <array>
-#include <vector>
-#include <set>
-#include <unordered_map>
+#include <atomic>
+#include <chrono>
+#include <climits>
+#include <cstdint>
+#include <functional>
+#include <deque>
+#include <memory>
+#include <mutex>
+#include <queue>
+#include <stdexcept>
+#include <string>
 #include <string_view>
-#include <limits>
+#include <unordered_map>
+#include <thread>
+#include <vector>
+#ifdef __linux__
+#include <pthread.h>
+#include <sched.h>
+#elif defined(_WIN32)
+#include <windows.h>
+#endif
 
 namespace py = pybind11;
 
 /* ---------- constants / helpers ---------- */
-constexpr double TICK = 0.01;
-constexpr int    INV_TICK = 100;
+constexpr double TICK       = 0.01;
+constexpr int    INV_TICK   = 100;
 constexpr size_t NUM_VENUES = 14;
+constexpr int    WINDOW     = 1001;               /* ±$5 in penny ticks    */
+constexpr int    HALF_W     = WINDOW / 2;
+constexpr int    NWORDS     = (WINDOW + 63) / 64; /* one bit per tick      */
 
 static const std::array<std::string_view,NUM_VENUES> VENUES = {
     "CBOE","ISE","BOX","MIAX","ARCA","PHLX","GEM","EDGX",
@@ -24,224 +45,634 @@ static const std::unordered_map<std::string_view,size_t> VENUE_MAP = {
     {"BZX",10},{"NDQ",11},{"C2",12},{"AMEX",13}
 };
 
-inline int    p2i(double p){ return int(p*INV_TICK + 0.5); }
+inline int    p2i(double p){ return int(p*INV_TICK + (p >= 0 ? 0.5 : -0.5)); }
 inline double i2p(int idx){  return idx*TICK; }
 
-/* ---------- PriceLevel ---------- */
+/* ---------- PriceLevel (off-window ticks only) ---------- */
 struct PriceLevel {
     std::array<uint32_t,NUM_VENUES> vqty{};
     uint32_t agg{0};
-    void adjust(size_t vid,int d){ vqty[vid]+=d; agg+=d; }
 };
 
-/* ---------- SideBook  (only sparse set) ---------- */
+/* view onto one tick's storage, dense or far */
+struct LevelRef { uint32_t* vqty; uint32_t* agg; };
+
+/* ---------- SideBook : SoA dense window + bitset + far heap ---------- */
 class SideBook {
     bool is_bid_;
-    std::set<int> ticks_;                       /* sorted price indices   */
-    std::unordered_map<int,PriceLevel> levels_; /* idx → bucket           */
+    bool init_{false};
+    int  win0_{0};
+    int  best_;
+
+    std::array<uint64_t,NWORDS> bits_{};                          /* live ticks  */
+    std::array<std::array<uint32_t,NUM_VENUES>,WINDOW> vqty_{};   /* [rel][vid]  */
+    std::array<uint32_t,WINDOW> agg_{};                           /* [rel]       */
+
+    std::unordered_map<int,PriceLevel> far_;  /* idx → bucket, off-window      */
+    std::priority_queue<int> heap_;           /* key(idx) of far ticks, lazy   */
+
+    int  key(int idx) const { return is_bid_ ? idx : -idx; }
+    bool better(int a,int b) const { return is_bid_ ? a > b : a < b; }
+    bool in_win(int idx) const { return idx >= win0_ && idx - win0_ < WINDOW; }
+
+    void set_bit(int rel){ bits_[rel >> 6] |=  (uint64_t(1) << (rel & 63)); }
+    void clr_bit(int rel){ bits_[rel >> 6] &= ~(uint64_t(1) << (rel & 63)); }
+
+    /* highest set rel < r, or -1 */
+    int highest_below(int r) const {
+        int w = r >> 6;
+        if (w < NWORDS) {
+            uint64_t m = bits_[w] & ((uint64_t(1) << (r & 63)) - 1);
+            if (m) return (w << 6) + 63 - __builtin_clzll(m);
+        }
+        for (int k = std::min(w, NWORDS) - 1; k >= 0; --k)
+            if (bits_[k]) return (k << 6) + 63 - __builtin_clzll(bits_[k]);
+        return -1;
+    }
+    /* lowest set rel > r, or -1 */
+    int lowest_above(int r) const {
+        ++r;
+        int w = r >> 6;
+        if (w >= NWORDS) return -1;
+        uint64_t m = bits_[w] & ~((uint64_t(1) << (r & 63)) - 1);
+        if (m) return (w << 6) + __builtin_ctzll(m);
+        for (int k = w + 1; k < NWORDS; ++k)
+            if (bits_[k]) return (k << 6) + __builtin_ctzll(bits_[k]);
+        return -1;
+    }
 
-public:
-    explicit SideBook(bool is_bid): is_bid_(is_bid){}
-    ~SideBook() = default;
-
-    /* add qty, return prev_best if best moved else INT_MIN */
-    int add(int idx,size_t vid,uint32_t qty){
-        auto &pl = levels_[idx];
-        int prev_best = best_idx();
-        bool first    = pl.agg==0;
-        pl.adjust(vid, int(qty));
-        if(first) ticks_.insert(idx);
-        int new_best  = best_idx();
-        if (prev == (is_bid_ ? -1 : std::numeric_limits<int>::max())){
-            return std::numeric_limits<int>::min();  // ignore sentinel-to-real 
+    int top_heap() {
+        while (!heap_.empty()) {
+            int idx = key(heap_.top());          /* key() is its own inverse */
+            if (far_.count(idx)) return idx;
+            heap_.pop();                         /* stale → lazy delete      */
+        }
+        return none();
+    }
+
+    /* drop stale keys once they outnumber live far levels */
+    void compact_heap() {
+        if (heap_.size() <= 2 * far_.size()) return;
+        std::vector<int> keys;
+        keys.reserve(far_.size());
+        for (const auto& kv : far_) keys.push_back(key(kv.first));
+        heap_ = std::priority_queue<int>(std::less<int>(), std::move(keys));
+    }
+
+    /* best after `idx` (the old best) emptied */
+    int rescan(int idx) {
+        if (in_win(idx)) {
+            int rel = idx - win0_;
+            int r = is_bid_ ? highest_below(rel) : lowest_above(rel);
+            if (r >= 0) return win0_ + r;
         }
-        return (new_best != prev_best) ? prev_best
-                                       : std::numeric_limits<int>::min();
+        int r = is_bid_ ? highest_below(WINDOW) : lowest_above(-1);
+        int w = r >= 0 ? win0_ + r : none();
+        int h = top_heap();
+        return better(h, w) ? h : w;
     }
 
-    /* remove qty, erase level if empty, update ticks_ */
-    void remove(int idx,size_t vid,uint32_t qty){
-        auto &pl = levels_.at(idx);
-        pl.adjust(vid,-int(qty));
-        if(pl.agg==0){
-            ticks_.erase(idx);
-            levels_.erase(idx);
+public:
+    explicit SideBook(bool is_bid): is_bid_(is_bid), best_(is_bid ? INT_MIN : INT_MAX){}
+
+    int  none() const { return is_bid_ ? INT_MIN : INT_MAX; }
+    int  best_idx() const { return best_; }
+    bool empty() const { return best_ == none(); }
+
+    /* storage for tick idx; far levels created on demand */
+    LevelRef level(int idx) {
+        if (in_win(idx)) {
+            int rel = idx - win0_;
+            return {vqty_[rel].data(), &agg_[rel]};
         }
+        auto& pl = far_[idx];
+        return {pl.vqty.data(), &pl.agg};
     }
 
-    int  best_idx() const {
-        if(ticks_.empty())
-            return is_bid_ ? -1 : std::numeric_limits<int>::max();
-        return is_bid_ ? *ticks_.rbegin() : *ticks_.begin();
+    /* add qty, return prev_best if best improved else none() */
+    int add(int idx, size_t vid, uint32_t qty) {
+        if (!init_) { win0_ = idx - HALF_W; init_ = true; }
+        LevelRef l = level(idx);
+        bool first = *l.agg == 0;
+        l.vqty[vid] += qty;
+        *l.agg      += qty;
+        if (!first) return none();
+        if (in_win(idx)) set_bit(idx - win0_);
+        else             heap_.push(key(idx));
+        if (!better(idx, best_)) return none();
+        int prev = best_;
+        best_ = idx;
+        return prev;                              /* none() on first-ever add */
     }
-    double best_price() const {
-        int b = best_idx();
-        if(is_bid_ && b==-1) return NAN;
-        if(!is_bid_ && b==std::numeric_limits<int>::max()) return NAN;
-        return i2p(b);
+
+    /* remove qty, drop level if empty, recompute best if it was the best */
+    void remove(int idx, size_t vid, uint32_t qty) {
+        LevelRef l = level(idx);
+        l.vqty[vid] -= qty;
+        *l.agg      -= qty;
+        if (*l.agg) return;
+        if (in_win(idx)) clr_bit(idx - win0_);
+        else           { far_.erase(idx); compact_heap(); }
+        if (idx == best_) best_ = rescan(idx);
+    }
+
+    /* bitmask of venues with size at idx (0 if no level) */
+    uint16_t venue_mask(int idx) {
+        if (!in_win(idx) && !far_.count(idx)) return 0;
+        LevelRef l = level(idx);
+        uint16_t m = 0;
+        for (size_t i = 0; i < NUM_VENUES; ++i)
+            if (l.vqty[i]) m |= uint16_t(1u << i);
+        return m;
     }
+};
 
-    /* expose levels for snapshot */
-    const std::unordered_map<int,PriceLevel>& levels() const { return levels_; }
+/* ---------- POD results (no Python objects in the core) ---------- */
+struct Jump {                                  /* NBBO improvement */
+    int      new_idx; uint32_t new_sz;
+    int      old_idx; uint32_t old_sz;
+    uint16_t old_mask;
+};
+struct Exec {                                  /* execution report */
+    int      idx; uint32_t rem;
+    std::array<uint32_t,NUM_VENUES> vqty;
+    uint16_t mask;
+};
 
-    py::dict snapshot(int idx) const {
-        py::dict d;
-        auto it = levels_.find(idx);
-        if(it==levels_.end()) return d;
-        const auto& pl = it->second;
-        for(size_t i=0;i<NUM_VENUES;++i)
-            if(pl.vqty[i]) d[py::str(VENUES[i])] = pl.vqty[i];
-        return d;
+struct Result { bool exec; Jump j; Exec e; };  /* one payload, tagged   */
+
+/* values shared with Python as pyorderbook.OP_* */
+enum class Op : uint8_t { Add = 0, Cancel = 1, Replace = 2, Execute = 3 };
+
+inline Op parse_op(const std::string& cmd) {
+    switch (cmd.empty() ? '\0' : cmd[0]) {
+        case 'a': return Op::Add;
+        case 'c': return Op::Cancel;
+        case 'r': return Op::Replace;
+        case 'e': return Op::Execute;
     }
+    throw std::runtime_error("Bad cmd");
+}
+
+/* alphabetically-sorted, comma-joined venues set in mask */
+static std::string venue_string(uint16_t mask) {
+    std::vector<std::string_view> names;
+    for (size_t i = 0; i < NUM_VENUES; ++i)
+        if (mask & (1u << i)) names.push_back(VENUES[i]);
+    std::sort(names.begin(), names.end());
+    std::string out;
+    for (auto n : names) {
+        if (!out.empty()) out.push_back(',');
+        out.append(n);
+    }
+    return out;                                /* e.g. "CBOE,ISE" */
+}
+
+/* one decoded event, as carried by the ring / SoA columns */
+struct Event {
+    int64_t  oid, ref;                         /* ref: replace's old oid */
+    int32_t  tick;
+    uint32_t qty;
+    uint8_t  op, vid, bid;
 };
 
+/* reject what the core would index out of bounds */
+inline void check_event(const Event& ev) {
+    if (ev.op > uint8_t(Op::Execute)) throw std::runtime_error("Bad cmd");
+    if (ev.vid >= NUM_VENUES)         throw std::invalid_argument("unknown venue");
+}
+
+static py::tuple jump_tuple(const Jump& j) {
+    return py::make_tuple(i2p(j.new_idx), j.new_sz,
+                          i2p(j.old_idx), j.old_sz,
+                          venue_string(j.old_mask));
+}
+static py::tuple exec_tuple(const Exec& e) {
+    py::list per_venue;
+    for (auto q : e.vqty) per_venue.append(q);
+    /* exec_price, total_remaining, qty_list, venue_str  (len == 4) */
+    return py::make_tuple(i2p(e.idx), e.rem, per_venue, venue_string(e.mask));
+}
+static py::tuple result_tuple(const Result& r) {
+    return r.exec ? exec_tuple(r.e) : jump_tuple(r.j);
+}
+
 /* ---------- OrderBook ---------- */
 class OrderBook {
     SideBook bid_{true};
     SideBook ask_{false};
 
-    struct Meta{ SideBook* sb; int idx; size_t vid; uint32_t qty; };
-    std::unordered_map<std::string,Meta> omap_;
-
-    /* helper to build NBBO-improvement tuple */
-    py::object nbbo_tuple(SideBook& sb, int new_idx, int old_idx) {
-        const auto& new_pl = sb.levels().at(new_idx);
-        const auto& old_pl = sb.levels().at(old_idx);
-        return py::make_tuple(
-            i2p(new_idx), new_pl.agg,
-            i2p(old_idx), old_pl.agg,
-            venue_string(old_pl)             // <── concatenated string
-        );
-    }
-    /* alphabetically-sorted concatenation of venues with qty > 0  */
-    static std::string venue_string(const PriceLevel& pl) {
-        std::string out;
-        for (size_t i = 0; i < NUM_VENUES; ++i)
-            if (pl.vqty[i]) out.push_back(VENUE_CODE[i]);
-        std::sort(out.begin(), out.end());        // alphabetical
-        return out;                               // e.g. "CNX"
-    }
-    public:
-    OrderBook() = default;
+    struct Meta{ bool bid; int idx; uint8_t vid; uint32_t qty; };
+    std::unordered_map<int64_t,Meta> omap_;
 
-    /* ---------- single-message API ---------- */
-    py::object on_add(const std::string& oid,const char venue_code,,
-                      const py::bytes& side_b,double price,uint32_t qty){
-        bool bid = side_b==py::bytes("BID");
-        SideBook& sb = bid? bid_ : ask_;
-        int idx = p2i(price);
-        size_t vid = VENUE_MAP.at(venue_code);
+    SideBook& sb(bool bid){ return bid ? bid_ : ask_; }
 
-        int prev_best = sb.add(idx,vid,qty);
-        omap_[oid] = {&sb,idx,vid,qty};
+    static bool is_bid(const std::string& side){ return side == "BID"; }
+    static size_t vid_of(const std::string& venue){
+        auto it = VENUE_MAP.find(venue);
+        if (it == VENUE_MAP.end()) throw std::invalid_argument("unknown venue");
+        return it->second;
+    }
 
-        if(prev_best!=std::numeric_limits<int>::min())
-            return nbbo_tuple(sb,idx,prev_best);
-        return py::none();
+public:
+    OrderBook() = default;
+
+    /* ---------- core (POD in / POD out) ---------- */
+    bool add(int64_t oid, size_t vid, bool bid, int idx, uint32_t qty, Jump& out) {
+        SideBook& s = sb(bid);
+        int prev = s.add(idx, vid, qty);
+        omap_[oid] = {bid, idx, uint8_t(vid), qty};
+        if (prev == s.none()) return false;
+        out = {idx, *s.level(idx).agg, prev, *s.level(prev).agg, s.venue_mask(prev)};
+        return true;
     }
 
-    void on_cancel(const std::string& oid){
-        auto it=omap_.find(oid); if(it==omap_.end()) return;
-        auto m=it->second; omap_.erase(it);
-        m.sb->remove(m.idx,m.vid,m.qty);
+    void cancel(int64_t oid) {
+        auto it = omap_.find(oid); if (it == omap_.end()) return;
+        Meta m = it->second; omap_.erase(it);
+        sb(m.bid).remove(m.idx, m.vid, m.qty);
     }
 
-    py::object on_replace(const std::string& new_oid,const std::string& old_oid,
-                          char venue_code,const py::bytes& side_b,
-                          double price,uint32_t qty){
-        auto res=on_add(new_oid,venue_code,side_b,price,qty);
-        on_cancel(old_oid);
-        return res;
+    bool replace(int64_t new_oid, int64_t old_oid, size_t vid, bool bid,
+                 int idx, uint32_t qty, Jump& out) {
+        auto it = omap_.find(old_oid);
+        if (it == omap_.end()) return add(new_oid, vid, bid, idx, qty, out);
+        Meta m = it->second;
+        omap_.erase(it);                          /* before add: new_oid may == old_oid */
+        if (m.bid == bid && m.idx == idx && m.vid == vid) {
+            /* same tick & venue: resize in place, best only moves if it empties */
+            SideBook& s = sb(bid);
+            if      (qty > m.qty) s.add(idx, vid, qty - m.qty);
+            else if (qty < m.qty) s.remove(idx, vid, m.qty - qty);
+            omap_[new_oid] = {bid, idx, uint8_t(vid), qty};
+            return false;
+        }
+        /* add first --> NBBO snapshot reflects the book before the cancel */
+        bool jumped = add(new_oid, vid, bid, idx, qty, out);
+        sb(m.bid).remove(m.idx, m.vid, m.qty);
+        return jumped;
     }
 
-    py::object on_execute(const std::string& oid, uint32_t exec_qty) {
+    bool execute(int64_t oid, uint32_t exec_qty, Exec& out) {
         auto it = omap_.find(oid);
-        if (it == omap_.end()) return py::none();
-
-        Meta& m   = it->second;
+        if (it == omap_.end()) return false;
+        Meta& m = it->second;
         uint32_t take = std::min(exec_qty, m.qty);
-        m.qty    -= take;
-        m.sb->remove(m.idx, m.vid, take);
+        SideBook& s = sb(m.bid);
+        LevelRef l = s.level(m.idx);
+        out.idx = m.idx;
+        std::copy(l.vqty, l.vqty + NUM_VENUES, out.vqty.begin());
+        out.vqty[m.vid] -= take;
+        out.rem  = *l.agg - take;
+        out.mask = 0;
+        for (size_t i = 0; i < NUM_VENUES; ++i)
+            if (out.vqty[i]) out.mask |= uint16_t(1u << i);
+        m.qty -= take;
+        bool done = m.qty == 0;
+        s.remove(m.idx, m.vid, take);          /* may erase the level       */
+        if (done) omap_.erase(it);
+        return true;
+    }
+
+    /* dispatch one decoded event; true if `out` holds a payload */
+    bool apply(const Event& ev, Result& out) {
+        switch (Op(ev.op)) {
+        case Op::Add:
+            out.exec = false;
+            return add(ev.oid, ev.vid, ev.bid, ev.tick, ev.qty, out.j);
+        case Op::Cancel:
+            cancel(ev.oid);
+            return false;
+        case Op::Replace:
+            out.exec = false;
+            return replace(ev.oid, ev.ref, ev.vid, ev.bid, ev.tick, ev.qty, out.j);
+        case Op::Execute:
+            out.exec = true;
+            return execute(ev.oid, ev.qty, out.e);
+        }
+        throw std::runtime_error("Bad cmd");
+    }
 
-        const PriceLevel& pl = m.sb->levels().at(m.idx);
-        py::list per_venue;
-        for (auto q : pl.vqty) per_venue.append(q);
+    /* ---------- single-message API ---------- */
+    py::object on_add(int64_t oid, const std::string& venue,
+                      const std::string& side, double price, uint32_t qty) {
+        Jump j;
+        if (add(oid, vid_of(venue), is_bid(side), p2i(price), qty, j))
+            return jump_tuple(j);
+        return py::none();
+    }
 
-        std::string venues = venue_string(pl);
+    void on_cancel(int64_t oid){ cancel(oid); }
 
-        if (m.qty == 0) omap_.erase(it);
+    py::object on_replace(int64_t new_oid, int64_t old_oid, const std::string& venue,
+                          const std::string& side, double price, uint32_t qty) {
+        Jump j;
+        if (replace(new_oid, old_oid, vid_of(venue), is_bid(side), p2i(price), qty, j))
+            return jump_tuple(j);
+        return py::none();
+    }
 
-        /* exec_price, total_remaining, qty_list, venue_str  (len == 4) */
-        return py::make_tuple(i2p(m.idx), pl.agg, per_venue, venues);
+    py::object on_execute(int64_t oid, uint32_t exec_qty) {
+        Exec e;
+        if (execute(oid, exec_qty, e)) return exec_tuple(e);
+        return py::none();
     }
+
     /* ---------- batch API ---------- */
-/* ---------- batch API ---------- */
-    py::list on_batch(py::iterable batch) {
-        py::list out;
-        out.reserve(py::len(batch));              // pre-allocate Python list
+    /* prices arrive already quantized to int ticks (done once at ingest) */
+    std::vector<py::tuple> on_batch(py::iterable batch) {
+        std::vector<py::tuple> out;
+        Jump j; Exec e;
 
         for (auto item : batch) {
-            auto t   = item.cast<py::tuple>();
-            std::string cmd = t[0].cast<std::string>();
-
-            if (cmd == "add") {
-                py::object res = on_add(
-                    t[1].cast<std::string>(),     // oid
-                    t[2].cast<char>(),     // venue
-                    t[3].cast<py::bytes>(),       // side
-                    t[4].cast<double>(),          // price
-                    t[5].cast<uint32_t>()         // qty
-                );
-                if (!res.is_none())
-                    out.append(res);
-
-            } else if (cmd == "execute") {
-                py::object res = on_execute(
-                    t[1].cast<std::string>(),     // oid
-                    t[2].cast<uint32_t>()         // exec_qty
-                );
-                if (!res.is_none())
-                    out.append(res);
-
-            } else if (cmd == "cancel") {
-                on_cancel(t[1].cast<std::string>());   // nothing to append
-
-            } else if (cmd == "replace") {
-                py::object res = on_replace(
-                    t[1].cast<std::string>(),     // new_oid
-                    t[2].cast<std::string>(),     // old_oid
-                    t[3].cast<char>(),     // venue
-                    t[4].cast<py::bytes>(),       // side
-                    t[5].cast<double>(),          // price
-                    t[6].cast<uint32_t>()         // qty
-                );
-                if (!res.is_none())
-                    out.append(res);
-
-            } else {
-                throw std::runtime_error("Bad cmd");
+            auto t = item.cast<py::tuple>();
+            switch (parse_op(t[0].cast<std::string>())) {
+            case Op::Add:        /* ("add", oid, venue, side, tick, qty) */
+                if (add(t[1].cast<int64_t>(),
+                        vid_of(t[2].cast<std::string>()),
+                        is_bid(t[3].cast<std::string>()),
+                        t[4].cast<int32_t>(),
+                        t[5].cast<uint32_t>(), j))
+                    out.push_back(jump_tuple(j));
+                break;
+            case Op::Cancel:     /* ("cancel", oid) */
+                cancel(t[1].cast<int64_t>());
+                break;
+            case Op::Replace:    /* ("replace", new_oid, old_oid, venue, side, tick, qty) */
+                if (replace(t[1].cast<int64_t>(), t[2].cast<int64_t>(),
+                            vid_of(t[3].cast<std::string>()),
+                            is_bid(t[4].cast<std::string>()),
+                            t[5].cast<int32_t>(),
+                            t[6].cast<uint32_t>(), j))
+                    out.push_back(jump_tuple(j));
+                break;
+            case Op::Execute:    /* ("execute", oid, exec_qty) */
+                if (execute(t[1].cast<int64_t>(), t[2].cast<uint32_t>(), e))
+                    out.push_back(exec_tuple(e));
+                break;
             }
         }
-        return out;                               // list may be shorter than batch
+        return out;                            /* may be shorter than batch */
     }
 
+    /* ---------- SoA batch API ---------- */
+    /* one column per field, first n rows valid; side: 1 → BID, 0 → ASK.
+       Strided / mistyped columns are copied to contiguous ones by pybind. */
+    template <class T>
+    using col = py::array_t<T, py::array::c_style | py::array::forcecast>;
+
+    std::vector<py::tuple> on_batch_soa(
+            col<int8_t>  op,   col<int64_t> oid,
+            col<int64_t> ref,  col<int8_t>  vid,
+            col<int8_t>  side, col<int32_t> tick,
+            col<int32_t> qty,  size_t n) {
+        for (const py::array* a : {static_cast<py::array*>(&op),
+                                   static_cast<py::array*>(&oid),
+                                   static_cast<py::array*>(&ref),
+                                   static_cast<py::array*>(&vid),
+                                   static_cast<py::array*>(&side),
+                                   static_cast<py::array*>(&tick),
+                                   static_cast<py::array*>(&qty)})
+            if (size_t(a->size()) < n) throw std::invalid_argument("column shorter than n");
+
+        const int8_t*  o = op.data();   const int64_t* id = oid.data();
+        const int64_t* r = ref.data();  const int8_t*  v  = vid.data();
+        const int8_t*  s = side.data(); const int32_t* t  = tick.data();
+        const int32_t* q = qty.data();
+
+        /* validate every row first: a bad one rejects the whole batch */
+        std::vector<Event> evs(n);
+        for (size_t i = 0; i < n; ++i) {
+            evs[i] = {id[i], r[i], t[i], uint32_t(q[i]),
+                      uint8_t(o[i]), uint8_t(v[i]), uint8_t(s[i] != 0)};
+            check_event(evs[i]);
+        }
+
+        std::vector<Result> res;
+        {
+            py::gil_scoped_release nogil;      /* pure C++ until the tuples */
+            Result x;
+            for (const auto& ev : evs)
+                if (apply(ev, x)) res.push_back(x);
+        }
+        std::vector<py::tuple> out;
+        out.reserve(res.size());
+        for (const auto& x : res) out.push_back(result_tuple(x));
+        return out;
+    }
 
     /* ---------- utilities ---------- */
+    /* int ticks internally; float only when publishing */
+    py::object best_bid_tick() const {
+        return bid_.empty() ? py::none() : py::object(py::int_(bid_.best_idx()));
+    }
+    py::object best_ask_tick() const {
+        return ask_.empty() ? py::none() : py::object(py::int_(ask_.best_idx()));
+    }
     py::object best_bid() const {
-        double p=bid_.best_price(); return std::isnan(p)?py::none():py::float_(p);
+        return bid_.empty() ? py::none() : py::object(py::float_(i2p(bid_.best_idx())));
     }
     py::object best_ask() const {
-        double p=ask_.best_price(); return std::isnan(p)?py::none():py::float_(p);
+        return ask_.empty() ? py::none() : py::object(py::float_(i2p(ask_.best_idx())));
+    }
+    py::dict snapshot(const std::string& side, double price) {
+        py::dict d;
+        SideBook& s = sb(is_bid(side));
+        int idx = p2i(price);
+        uint16_t mask = s.venue_mask(idx);
+        if (!mask) return d;
+        LevelRef l = s.level(idx);
+        for (size_t i = 0; i < NUM_VENUES; ++i)
+            if (l.vqty[i]) d[py::str(std::string(VENUES[i]))] = l.vqty[i];
+        return d;
+    }
+};
+
+/* ---------- SPSC ring : one producer, one consumer, no locks ---------- */
+template <typename T>
+class SpscRing {
+    alignas(64) std::atomic<uint64_t> write_pos_{0};   /* own line each   */
+    alignas(64) std::atomic<uint64_t> read_pos_{0};
+    alignas(64) const uint64_t mask_;
+    std::unique_ptr<T[]> buf_;
+
+public:
+    explicit SpscRing(size_t capacity)                  /* power of 2      */
+        : mask_(capacity - 1), buf_(new T[capacity]) {
+        if (capacity < 2 || (capacity & mask_))
+            throw std::invalid_argument("ring capacity must be a power of 2");
+    }
+
+    bool push(const T& x) {
+        uint64_t w = write_pos_.load(std::memory_order_relaxed);
+        if (w - read_pos_.load(std::memory_order_acquire) > mask_) return false;  /* full */
+        buf_[w & mask_] = x;
+        write_pos_.store(w + 1, std::memory_order_release);
+        return true;
+    }
+    bool pop(T& x) {
+        uint64_t r = read_pos_.load(std::memory_order_relaxed);
+        if (r == write_pos_.load(std::memory_order_acquire)) return false;        /* empty */
+        x = buf_[r & mask_];
+        read_pos_.store(r + 1, std::memory_order_release);
+        return true;
+    }
+    bool empty() const {
+        return read_pos_.load(std::memory_order_acquire) ==
+               write_pos_.load(std::memory_order_acquire);
+    }
+};
+
+/* wait strategy for an empty/full ring: yield for a while (keeps the
+   hot-path latency), then sleep 50 us doubling to 1 ms so idle threads
+   stop burning a core */
+class Backoff {
+    unsigned n_{0};
+public:
+    void reset() { n_ = 0; }
+    void pause() {
+        constexpr unsigned SPINS = 64;
+        if (n_ < SPINS) { ++n_; std::this_thread::yield(); return; }
+        unsigned k = std::min(n_++ - SPINS, 4u);
+        std::this_thread::sleep_for(std::chrono::microseconds(50u << k));
+    }
+};
+
+static void pin_current_thread(int cpu) {
+    if (cpu < 0) return;
+#ifdef __linux__
+    cpu_set_t set;
+    CPU_ZERO(&set);
+    CPU_SET(cpu, &set);
+    pthread_setaffinity_np(pthread_self(), sizeof(set), &set);
+#elif defined(_WIN32)
+    SetThreadAffinityMask(GetCurrentThread(), DWORD_PTR(1) << cpu);
+#endif
+}
+
+/* ---------- OrderRing : feed → [events] → match thread → [results] ---------- */
+class OrderRing {
+    OrderBook           book_;                 /* touched by the match thread only */
+    SpscRing<Event>     events_;
+    SpscRing<Result>    results_;
+    std::atomic<bool>   running_{false};
+    std::atomic<bool>   done_{false};          /* match loop has returned         */
+    std::thread         match_;
+    std::mutex          stop_mu_;              /* stop() may race from two threads */
+
+    /* after stop(), results that find the ring full go here instead of
+       waiting on a publisher that may be gone; poll() drains it last */
+    bool                spilling_{false};      /* match thread only */
+    std::mutex          spill_mu_;
+    std::deque<Result>  spill_;
+
+    void emit(const Result& r) {
+        Backoff wait;
+        while (!spilling_ && !results_.push(r)) {
+            if (!running_.load(std::memory_order_acquire)) spilling_ = true;
+            else wait.pause();
+        }
+        if (spilling_) {
+            std::lock_guard<std::mutex> lk(spill_mu_);
+            spill_.push_back(r);
+        }
+    }
+
+    /* runs until stop() and the event ring is drained; no Python inside */
+    void match_loop(int cpu) {
+        pin_current_thread(cpu);
+        Event ev; Result res; Backoff idle;
+        for (;;) {
+            if (!events_.pop(ev)) {
+                if (!running_.load(std::memory_order_acquire) && events_.empty()) break;
+                idle.pause();
+                continue;
+            }
+            idle.reset();
+            if (book_.apply(ev, res)) emit(res);
+        }
+        done_.store(true, std::memory_order_release);
     }
-    py::dict snapshot(const py::bytes& side_b,double price) const {
-        const SideBook& sb=(side_b==py::bytes("BID"))?bid_:ask_;
-        return sb.snapshot(p2i(price));
+
+    void reset_loop_state() { done_.store(false); spilling_ = false; }
+
+public:
+    explicit OrderRing(size_t capacity): events_(capacity), results_(capacity) {}
+    ~OrderRing() { stop(); }
+
+    /* feed side: spin (GIL released) while the ring is full */
+    void push(uint8_t op, int64_t oid, int64_t ref, uint8_t vid,
+              bool bid, int32_t tick, uint32_t qty) {
+        Event ev{oid, ref, tick, qty, op, vid, uint8_t(bid)};
+        check_event(ev);                       /* never throw on the match thread */
+        if (events_.push(ev)) return;
+        py::gil_scoped_release nogil;
+        Backoff wait;
+        while (!events_.push(ev)) {
+            if (!running_.load(std::memory_order_acquire))
+                throw std::runtime_error("OrderRing stopped");   /* else spins forever */
+            wait.pause();
+        }
+    }
+
+    /* run the match loop on the calling thread (blocks until stop()) */
+    void run_match_loop(int cpu) {
+        reset_loop_state();
+        running_.store(true, std::memory_order_release);
+        match_loop(cpu);
+    }
+
+    /* run the match loop on its own (optionally pinned) thread */
+    void start(int cpu) {
+        if (running_.load() || match_.joinable()) return;
+        reset_loop_state();
+        running_.store(true, std::memory_order_release);
+        match_ = std::thread([this, cpu]{ match_loop(cpu); });
+    }
+
+    void stop() {
+        running_.store(false, std::memory_order_release);
+        py::gil_scoped_release nogil;
+        std::lock_guard<std::mutex> lk(stop_mu_);
+        if (match_.joinable()) match_.join();
+    }
+
+    /* publisher side: wait up to timeout_ms for results, take ≤ max_n */
+    std::vector<py::tuple> poll(size_t max_n, int timeout_ms) {
+        std::vector<Result> got;
+        {
+            py::gil_scoped_release nogil;
+            auto until = std::chrono::steady_clock::now()
+                       + std::chrono::milliseconds(timeout_ms);
+            Result r; Backoff wait;
+            while (got.size() < max_n) {
+                if (results_.pop(r)) { got.push_back(r); continue; }
+                if (done_.load(std::memory_order_acquire)) {   /* ring is final */
+                    std::lock_guard<std::mutex> lk(spill_mu_);
+                    while (got.size() < max_n && !spill_.empty()) {
+                        got.push_back(spill_.front());
+                        spill_.pop_front();
+                    }
+                    break;
+                }
+                if (!got.empty() || std::chrono::steady_clock::now() >= until) break;
+                wait.pause();
+            }
+        }
+        std::vector<py::tuple> out;
+        out.reserve(got.size());
+        for (const auto& r : got) out.push_back(result_tuple(r));
+        return out;
     }
 };
 
 /* ---------- bindings ---------- */
 PYBIND11_MODULE(pyorderbook, m){
     using namespace py::literals;
+    m.attr("OP_ADD")     = int(Op::Add);
+    m.attr("OP_CANCEL")  = int(Op::Cancel);
+    m.attr("OP_REPLACE") = int(Op::Replace);
+    m.attr("OP_EXECUTE") = int(Op::Execute);
     py::class_<OrderBook>(m,"OrderBook")
         .def(py::init<>())
         .def("on_add",     &OrderBook::on_add,
@@ -251,7 +682,20 @@ PYBIND11_MODULE(pyorderbook, m){
              "new_oid"_a,"old_oid"_a,"venue"_a,"side"_a,"price"_a,"qty"_a)
         .def("on_execute", &OrderBook::on_execute,"oid"_a,"exec_qty"_a)
         .def("on_batch",   &OrderBook::on_batch,"batch"_a)
+        .def("on_batch_soa", &OrderBook::on_batch_soa,
+             "op"_a,"oid"_a,"ref"_a,"vid"_a,"side"_a,"tick"_a,"qty"_a,"n"_a)
+        .def("best_bid_tick", &OrderBook::best_bid_tick)
+        .def("best_ask_tick", &OrderBook::best_ask_tick)
         .def("best_bid",   &OrderBook::best_bid)
         .def("best_ask",   &OrderBook::best_ask)
         .def("snapshot",   &OrderBook::snapshot,"side"_a,"price"_a);
+    py::class_<OrderRing>(m,"OrderRing")
+        .def(py::init<size_t>(),"capacity"_a=1 << 16)
+        .def("push",           &OrderRing::push,
+             "op"_a,"oid"_a,"ref"_a,"vid"_a,"bid"_a,"tick"_a,"qty"_a)
+        .def("start",          &OrderRing::start,"cpu"_a=-1)
+        .def("run_match_loop", &OrderRing::run_match_loop,"cpu"_a=-1,
+             py::call_guard<py::gil_scoped_release>())
+        .def("stop",           &OrderRing::stop)
+        .def("poll",           &OrderRing::poll,"max_n"_a=256,"timeout_ms"_a=10);
 }
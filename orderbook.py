@@ -1,96 +1,110 @@
 #######################################################################
-#  PriceLevel  –  “bucket” for one price on one side
+#  Per-tick storage lives in OrderBook as side-interleaved numpy arrays:
+#    book[tick_rel, side_bit, venue]  /  agg[tick_rel, side_bit]
+#  numpy only allocates (aligned) and backs the scan kernels; per-event
+#  reads/writes go through flat memoryviews / array('…') – plain ints,
+#  no numpy scalar boxing (see bench_orderbook.py)
 #######################################################################
 from array import array
-from enum  import Enum, auto
 import heapq
-from sortedcontainers import SortedList
+import numpy as np
 TICK_SIZE = 0.01
 INV_TICK  = 1.0 / TICK_SIZE
 VENUES    = ["CBOE","ISE","BOX","MIAX","ARCA","PHLX","GEM","EDGX",
              "BAT","MRX","BZX","NDQ","C2","AMEX"]
 VENUE_MAP = {v:i for i,v in enumerate(VENUES)}
+VENUES_ALPHA = sorted(range(len(VENUES)), key=VENUES.__getitem__)  # vids, by name
 NUM_VENUES = len(VENUES)
 WINDOW   = 1001           # odd → symmetric → covers ±$5 in penny ticks
 HALF_W   = WINDOW // 2
-def p2i(price: float) -> int: return int(round(price * INV_TICK, 2))
+NWORDS   = (WINDOW + 63) // 64   # 16 × 64-bit words → one bit per tick
+MAX_ORDERS = 1 << 16      # initial order-slab capacity, doubles when full
+VENUE_DTYPE = np.uint16   # per-venue size; np.uint32 for markets needing > 65535
+VENUE_MAX   = int(np.iinfo(VENUE_DTYPE).max)
+VENUE_CODE  = np.dtype(VENUE_DTYPE).char    # same typecode for array('…')
+VENUE_SLOTS = 16          # NUM_VENUES padded → bid+ask of a tick = 64 B at uint16
+INT_MIN, INT_MAX = -(1 << 31), (1 << 31) - 1   # empty-side sentinels (bid, ask)
+_DEBUG   = False          # best_price tracing; stripped entirely under -O
+COARSE_STRIDE = 10           # 10¢ buckets …
+COARSE_W      = 1001         # … × 1001 → covers ±$50, contains the 1¢ window
+COARSE_SPAN   = COARSE_W * COARSE_STRIDE
+CACHE_LINE = 64
+def aligned_zeros(shape, dtype, align: int = CACHE_LINE) -> np.ndarray:
+    """np.zeros starting on an ``align``-byte boundary, padded to whole lines"""
+    dtype = np.dtype(dtype)
+    n   = int(np.prod(shape)) * dtype.itemsize
+    buf = np.zeros(-(-n // align) * align + align, np.uint8)
+    off = -buf.ctypes.data % align
+    return buf[off:off+n].view(dtype).reshape(shape)
+def venue_clip(new: int) -> int:
+    """out-of-range venue size: asserts under __debug__, saturates under -O"""
+    assert 0 <= new <= VENUE_MAX, f"venue size {new} overflows {VENUE_DTYPE.__name__}"
+    return 0 if new < 0 else VENUE_MAX
+def venue_adjust(vq, vid: int, delta: int):
+    """vq[vid] += delta, through venue_clip when out of range"""
+    new = vq[vid] + delta
+    vq[vid] = new if 0 <= new <= VENUE_MAX else venue_clip(new)
+def p2i(price: float) -> int:     # round half away from zero, no round()
+    return int(price * INV_TICK + (0.5 if price >= 0 else -0.5))
 def i2p(idx: int)   -> float: return idx * TICK_SIZE
-class PriceLevel:
-    """
-    One object per (price, side).  Knows nothing about NBBO;
-    it just tracks per-venue and aggregate size, then returns Δagg.
-    """
-    __slots__ = ("venue_qty", "agg_qty")
 
-    def __init__(self):
-        self.venue_qty = array('I', [0]) * NUM_VENUES
-        self.agg_qty   = 0
-
-    def adjust(self, venue_id: int, delta: int) -> int:
-        """
-        ±delta (add, execute or cancel) for that venue.
-        Returns Δaggregate so that the OrderBook can update its arrays.
-        """
-        self.venue_qty[venue_id] += delta
-        new_agg = self.agg_qty + delta
-        diff    = new_agg - self.agg_qty
-        self.agg_qty = new_agg
-        return diff                            # could be + or –
-    def snapshot_by_venue(self):
-        """Return (sorted_venues_with_size, size_dict) after update."""
-        active = []
-
-        for vid, q in enumerate(self.venue_qty):
-            if q:                             # skip zeroes
-                name = VENUES[vid]
-                active.append(name)
-        active.sort()                         # alphabetical
-        return active, self.venue_qty 
+# bitset scan kernels: AOT build if present (python build_kernels.py),
+# else the numba JIT versions – only that path imports numba
+try:
+    from orderbook_kernels import best_after_dec, best_in_coarse
+except ImportError:
+    from orderbook_jit import best_after_dec, best_in_coarse
 
-    
 class DenseWindowSide:
-    __slots__=("is_bid","win0","flags","best","initial","heap","tomb")
-    def __init__(self, first_idx:int, is_bid:bool):
-        self.is_bid=is_bid
-        self.win0  =first_idx-HALF_W
-        self.flags =array('b',[0])*WINDOW
-        self.best  = -1 if is_bid else float('inf')
-        self.initial = -1 if is_bid else float('inf')
+    """
+    1¢ bitset window (±$5) for the hot path, 10¢-bucket window (±$50)
+    holding a 10-bit tick mask per bucket, heap only beyond that.
+    Every tick in the fine window is also set in the coarse one.
+
+    Direction-specific methods live in BidSide / AskSide so no hot path
+    branches on the side; ``is_bid`` and ``initial`` are class constants.
+    """
+    __slots__=("win0","bits","bitsv","coarse0","coarse","coarsev",
+               "best","heap","tomb")
+    is_bid : bool
+    initial: int
+    def __init__(self, center:int):
+        self.win0  =center-HALF_W
+        self.bits  =np.zeros(NWORDS, np.uint64)     # scanned by the kernels …
+        self.bitsv =memoryview(self.bits)           # … set/cleared from Python
+        self.coarse0=center-COARSE_SPAN//2
+        self.coarse =np.zeros(COARSE_W, np.uint16)
+        self.coarsev=memoryview(self.coarse)
+        self.best  = self.initial
         self.heap  =[]
         self.tomb  =set()
-        self._set(first_idx)
     # helpers
     def _in_win(self,i): return self.win0<=i<self.win0+WINDOW
     def _rel(self,i):    return i-self.win0
     def _set(self,i):
-        if self._in_win(i): self.flags[self._rel(i)]=1
-        else: heapq.heappush(self.heap,-i if self.is_bid else i)
+        c=i-self.coarse0
+        if 0<=c<COARSE_SPAN:
+            r=i-self.win0
+            if 0<=r<WINDOW: self.bitsv[r>>6]|=1<<(r&63)
+            b,k=divmod(c,COARSE_STRIDE); self.coarsev[b]|=1<<k
+        else:
+            self.tomb.discard(i)            # re-added after a cancel
+            self._push(i)
     def _clr(self,i):
-        if self._in_win(i): self.flags[self._rel(i)]=0
-        else: self.tomb.add(i)
-    def _top_heap(self):
-        h,t=self.heap,self.tomb
-        while h and ((-h[0] if self.is_bid else h[0]) in t):
-            t.remove(-heapq.heappop(h) if self.is_bid else heapq.heappop(h))
-        return (-h[0] if self.is_bid else h[0]) if h else (-1 if self.is_bid else float('inf'))
-    def _best_in_window(self):
-        if self.is_bid:                    # scan downwards
-            for rel in range(WINDOW-1, -1, -1):
-                if self.flags[rel]:
-                    return self.win0 + rel
-        else:                              # scan upwards
-            for rel in range(WINDOW):
-                if self.flags[rel]:
-                    return self.win0 + rel
-        return -1 if self.is_bid else float('inf')
+        c=i-self.coarse0
+        if 0<=c<COARSE_SPAN:
+            r=i-self.win0
+            if 0<=r<WINDOW: self.bitsv[r>>6]&=~(1<<(r&63))
+            b,k=divmod(c,COARSE_STRIDE); self.coarsev[b]&=0xFFFF^(1<<k)
+        else:
+            self.tomb.add(i)
+            if len(self.tomb) > len(self.heap)//2: self._purge_heap()
+    def _best_in_coarse(self):
+        r = best_in_coarse(self.coarse, self.is_bid, COARSE_STRIDE)
+        if r >= 0:
+            return self.coarse0 + r
+        return self.initial
     # public ----------------------------------------------------------
-    def inc_level(self, idx:int):
-        """returns prev_best_idx if best improved else None"""
-        prev=self.best
-        self._set(idx)
-        if (self.is_bid and idx>self.best) or (not self.is_bid and idx<self.best):
-            self.best=idx
-        return prev if prev!=self.initial else None
     def dec_level(self, idx:int):
         self._clr(idx)
         if idx != self.best:
@@ -98,104 +112,264 @@ class DenseWindowSide:
 
         # ---------- recompute best ----------
         if self._in_win(idx):
-            step = -1 if self.is_bid else 1
-            r    = self._rel(idx) + step
-            while 0 <= r < WINDOW and self.flags[r] == 0:
-                r += step
-            if 0 <= r < WINDOW:
+            rel = self._rel(idx)
+            r = best_after_dec(self.bits, self.is_bid, rel)
+            if r >= 0:
                 self.best = self.win0 + r
                 return
 
-        # Either we were outside window, or window scan found nothing
-        self.best = self._top_heap()
-        if (self.best == -1 and self.is_bid) or \
-           (self.best == float('inf') and not self.is_bid):
-            # heap empty → fall back to any tick still set in the window
-            self.best = self._best_in_window()
+        # Either we were outside window, or window scan found nothing:
+        # best of the coarse window (⊇ fine window) and the far heap
+        self.best = self._pick(self._best_in_coarse(), self._top_heap())
     def best_price(self):
-        if self.is_bid and self.best==-1: return None
-        if (not self.is_bid) and self.best==float('inf'): return None
-        print(self.best, "h")
+        if self.best==self.initial: return None
+        if __debug__ and _DEBUG: print(self.best, "h")
         return i2p(self.best)
 
+
+class BidSide(DenseWindowSide):
+    """best = highest tick; heap holds -idx (max-heap)"""
+    __slots__=()
+    is_bid =True
+    initial=INT_MIN
+    def _push(self,i): heapq.heappush(self.heap,-i)
+    def _top_heap(self):
+        # lazy delete: tombstoned entries are popped, the tomb set is
+        # left alone (pruned wholesale by _purge_heap instead)
+        h,t=self.heap,self.tomb
+        while h:
+            if -h[0] in t:
+                heapq.heappop(h); continue
+            return -h[0]
+        return INT_MIN
+    def _purge_heap(self):
+        """drop every tombstoned entry and reset the tomb – O(n)"""
+        t=self.tomb
+        self.heap=[k for k in self.heap if -k not in t]
+        heapq.heapify(self.heap)
+        t.clear()
+    @staticmethod
+    def _pick(a,b): return a if a>b else b      # INT_MIN loses by itself
+    def inc_level(self, idx:int):
+        """returns prev_best_idx if best improved else None"""
+        prev=self.best
+        self._set(idx)
+        if idx>prev:
+            self.best=idx
+            return prev if prev!=INT_MIN else None
+        return None
+
+
+class AskSide(DenseWindowSide):
+    """best = lowest tick; heap holds idx (min-heap)"""
+    __slots__=()
+    is_bid =False
+    initial=INT_MAX
+    def _push(self,i): heapq.heappush(self.heap,i)
+    def _top_heap(self):
+        # lazy delete, see BidSide._top_heap
+        h,t=self.heap,self.tomb
+        while h:
+            if h[0] in t:
+                heapq.heappop(h); continue
+            return h[0]
+        return INT_MAX
+    def _purge_heap(self):
+        """drop every tombstoned entry and reset the tomb – O(n)"""
+        t=self.tomb
+        self.heap=[k for k in self.heap if k not in t]
+        heapq.heapify(self.heap)
+        t.clear()
+    @staticmethod
+    def _pick(a,b): return a if a<b else b      # INT_MAX loses by itself
+    def inc_level(self, idx:int):
+        """returns prev_best_idx if best improved else None"""
+        prev=self.best
+        self._set(idx)
+        if idx<prev:
+            self.best=idx
+            return prev if prev!=INT_MAX else None
+        return None
+
 #######################################################################
 #  OrderBook  –  owns:
-#    • tick-indexed dict of PriceLevel objects
-#    • dense NBBO arrays (bid_qty[], ask_qty[])
+#    • tick-major, side-interleaved arrays (both sides share one window):
+#        book[rel, side_bit, vid]  (VENUE_DTYPE)
+#        agg [rel, side_bit]       (uint32 – sums all venues, kept wide)
+#      plus flat memoryviews over them for the per-event path
+#    • sparse {tick_idx -> (venue_qty, agg)} array rows for ticks off-window
 #    • best_bid_idx / best_ask_idx cursors
 #######################################################################
 
 
 class OrderBook:
+    # side-bit dispatch (1 → BID, 0 → ASK) on plain attributes: no
+    # bytes-keyed dict lookups on the per-event path
+    __slots__ = ("bid_side", "ask_side", "bid_far", "ask_far", "center",
+                 "book", "agg", "bookv", "aggv",
+                 "oid_slot", "side_arr", "idx_arr", "vid_arr", "qty_arr",
+                 "free", "next_slot")
+
     def __init__(self):
-        # dense-window index per side, created lazily on first add
-        self.side_idx = {b'BID': None, b'ASK': None}
+        # dense-window index per side, created lazily on first add; both
+        # are centred on the book's first tick so rel means the same tick
+        self.bid_side = self.ask_side = None
+        self.center   = None
 
-        # {side -> {tick_idx -> PriceLevel}}
-        self.levels   = {b'BID': {}, b'ASK': {}}
-        
-        self.order_map = {}
+        # bid & ask of one tick sit side by side: at uint16, book[rel] is
+        # exactly one 64 B line, so NBBO-forming events touch one line
+        self.book = aligned_zeros((WINDOW, 2, VENUE_SLOTS), VENUE_DTYPE)
+        self.agg  = aligned_zeros((WINDOW, 2), np.uint32)
+        # flat views: venue cell (2*rel+b)*VENUE_SLOTS+vid, agg cell 2*rel+b
+        self.bookv = memoryview(self.book.reshape(-1))
+        self.aggv  = memoryview(self.agg.reshape(-1))
+        # {tick_idx -> (venue_qty[NUM_VENUES], agg[1])} per side
+        self.bid_far  = {}
+        self.ask_far  = {}
 
-    def _idx_obj(self, side: bytes, idx: int) -> DenseWindowSide:
-        s = self.side_idx[side]
+        # order slab: oid -> slot into parallel arrays, freed slots reused
+        self.oid_slot  = {}
+        self.side_arr  = array('b', [0]) * MAX_ORDERS     # side bit
+        self.idx_arr   = array('q', [0]) * MAX_ORDERS
+        self.vid_arr   = array('b', [0]) * MAX_ORDERS
+        self.qty_arr   = array('I', [0]) * MAX_ORDERS
+        self.free      = []
+        self.next_slot = 0
+
+    def _idx_obj(self, b: int, idx: int) -> DenseWindowSide:
+        s = self.bid_side if b else self.ask_side
         if s is None:
-            self.side_idx[side] = s = DenseWindowSide(idx, side == b'BID')
+            if self.center is None:
+                self.center = idx
+            if b: self.bid_side = s = BidSide(self.center)
+            else: self.ask_side = s = AskSide(self.center)
         return s
 
+    def _alloc_slot(self) -> int:
+        if self.free:
+            return self.free.pop()
+        slot = self.next_slot
+        if slot == len(self.qty_arr):
+            self._grow()
+        self.next_slot = slot + 1
+        return slot
+
+    def _grow(self):
+        for arr in (self.side_arr, self.idx_arr, self.vid_arr, self.qty_arr):
+            arr.extend(array(arr.typecode, [0]) * len(arr))   # doubles in place
+
+    def _level(self, b: int, s: DenseWindowSide, idx: int):
+        """(venue_qty buf, venue offset, agg buf, agg slot) backing tick ``idx``."""
+        rel = idx - s.win0
+        if 0 <= rel < WINDOW:
+            j = 2 * rel + b
+            return self.bookv, j * VENUE_SLOTS, self.aggv, j
+        far = self.bid_far if b else self.ask_far
+        lvl = far.get(idx)
+        if lvl is None:
+            lvl = far[idx] = (array(VENUE_CODE, [0]) * NUM_VENUES, array('I', [0]))
+        return lvl[0], 0, lvl[1], 0
+
+    @staticmethod
+    def snapshot_by_venue(venue_qty, off: int = 0):
+        """Return (sorted_venues_with_size, venue_qty) for the level at ``off``."""
+        active = [VENUES[v] for v in VENUES_ALPHA if venue_qty[off + v]]  # alphabetical
+        return active, venue_qty[off:off + NUM_VENUES]
+
+    def _remove(self, b, s, idx, vid, qty):
+        rel = idx - s.win0
+        if 0 <= rel < WINDOW:                 # inline _level, window case
+            j = 2 * rel + b; vq = self.bookv; off = j * VENUE_SLOTS; agg = self.aggv
+        else:
+            vq, off, agg, j = self._level(b, s, idx)
+        k = off + vid; n = vq[k] - qty
+        vq[k] = n if n >= 0 else venue_clip(n); agg[j] -= qty
+        if agg[j] == 0:
+            s.dec_level(idx)
+            (self.bid_far if b else self.ask_far).pop(idx, None)
+
     # ------------------------------------------------------------
     def on_add(self, oid, venue, side, price, qty):
-        idx,vid=p2i(price),VENUE_MAP[venue]
-        lvl=self.levels[side].get(idx)
-        first=False
-        if lvl is None:
-            lvl=self.levels[side][idx]=PriceLevel()
-            first=True
-        lvl.adjust(vid,+qty)
-        self.order_map[oid]=(side,idx,vid,qty)
+        idx=int(price*INV_TICK+(0.5 if price>=0 else -0.5))   # p2i, inlined
+        vid=VENUE_MAP[venue]
+        b=1 if side==b'BID' else 0
+        s=self.bid_side if b else self.ask_side
+        if s is None: s=self._idx_obj(b,idx)
+        rel=idx-s.win0
+        if 0<=rel<WINDOW:                     # inline _level, window case
+            j=2*rel+b; vq=self.bookv; off=j*VENUE_SLOTS; agg=self.aggv
+        else:
+            vq,off,agg,j=self._level(b,s,idx)
+        first=agg[j]==0
+        k=off+vid; n=vq[k]+qty
+        vq[k]=n if n<=VENUE_MAX else venue_clip(n); agg[j]+=qty
+        slot=self.oid_slot.get(oid)
+        if slot is None: slot=self.oid_slot[oid]=self._alloc_slot()
+        self.side_arr[slot]=b;   self.idx_arr[slot]=idx
+        self.vid_arr[slot]=vid;  self.qty_arr[slot]=qty
         if first:
-            prev_best_idx=self._idx_obj(side,idx).inc_level(idx)
+            prev_best_idx=s.inc_level(idx)
             if prev_best_idx is not None:
-                prev_lvl=self.levels[side][prev_best_idx]
+                prev_vq,prev_off,prev_agg,pj=self._level(b,s,prev_best_idx)
                 old_price=i2p(prev_best_idx)
-                old_size =prev_lvl.agg_qty
-                old_venues,_=prev_lvl.snapshot_by_venue()
+                old_size =prev_agg[pj]
+                old_venues,_=self.snapshot_by_venue(prev_vq,prev_off)
                 new_best=i2p(idx)
-                new_size=lvl.agg_qty
+                new_size=agg[j]
                 return new_best,new_size,old_price,old_size,old_venues
     
     def on_cancel(self, oid):
-        side,idx,vid,qty=self.order_map.pop(oid)
-        lvl=self.levels[side][idx]; lvl.adjust(vid,-qty)
-        if lvl.agg_qty==0:
-            self._idx_obj(side,idx).dec_level(idx)
-            del self.levels[side][idx]
+        slot=self.oid_slot.pop(oid); self.free.append(slot)
+        b=self.side_arr[slot]
+        self._remove(b,self.bid_side if b else self.ask_side,self.idx_arr[slot],
+                     self.vid_arr[slot],self.qty_arr[slot])
             
     def on_replace(self,new_oid,orig_oid,venue,side,price,qty):
-        # add first --> get NBBO improvement snapshot if any
+        slot=self.oid_slot.pop(orig_oid)
+        old_b=self.side_arr[slot];  old_idx=self.idx_arr[slot]
+        old_vid=self.vid_arr[slot]; old_qty=self.qty_arr[slot]
+        old_s=self.bid_side if old_b else self.ask_side
+        idx=int(price*INV_TICK+(0.5 if price>=0 else -0.5))   # p2i, inlined
+        if old_b==(side==b'BID') and old_idx==idx and old_vid==VENUE_MAP[venue]:
+            # same tick & venue: resize in place, one level touch,
+            # best can only move if the level empties
+            self.oid_slot[new_oid]=slot; self.qty_arr[slot]=qty
+            if qty>old_qty:
+                vq,off,agg,j=self._level(old_b,old_s,idx)
+                venue_adjust(vq,off+old_vid,qty-old_qty); agg[j]+=qty-old_qty
+            elif qty<old_qty:
+                self._remove(old_b,old_s,idx,old_vid,old_qty-qty)
+            return None
+        # add first --> NBBO snapshot reflects the pre-cancel book;
+        # orig's slot is handed straight to new_oid
+        self.free.append(slot)
         info=self.on_add(new_oid,venue,side,price,qty)
-        self.on_cancel(orig_oid)
+        self._remove(old_b,old_s,old_idx,old_vid,old_qty)
         return info
 
     def on_execute(self, oid, exec_qty):
-        pass
-        side, idx, venue_id, qty_left = self.order_map[oid]
+        slot = self.oid_slot[oid]
+        qty_left = self.qty_arr[slot]
         take = min(exec_qty, qty_left)
-        self.order_map[oid] = (side, idx, venue_id, qty_left - take)
-
-        lvl  = self.levels[side][idx]
-        dagg = lvl.adjust(venue_id, -take)
+        self.qty_arr[slot] = qty_left - take
 
-        if lvl.agg_qty == 0:
-            self._idx_obj(side,idx).dec_level(idx)
-            del self.levels[side][idx]
+        b = self.side_arr[slot]
+        self._remove(b, self.bid_side if b else self.ask_side,
+                     self.idx_arr[slot], self.vid_arr[slot], take)
         if (qty_left - take) == 0:
-            del self.order_map[oid]
+            del self.oid_slot[oid]
+            self.free.append(slot)
+    # int ticks internally; i2p only at publication (best_* / NBBO tuples)
+    def best_bid_tick(self):
+        s=self.bid_side
+        return None if s is None or s.best==s.initial else s.best
+    def best_ask_tick(self):
+        s=self.ask_side
+        return None if s is None or s.best==s.initial else s.best
     def best_bid(self): 
-        s=self.side_idx[b'BID']
+        s=self.bid_side
         return None if s is None else s.best_price()
     def best_ask(self):
-        s=self.side_idx[b'ASK']
+        s=self.ask_side
         return None if s is None else s.best_price()
     
-
-
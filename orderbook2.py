@@ -1,27 +1,47 @@
-import pyorderbook
+import threading
+
+import pyorderbook  # python build_ext.py
+from orderbook import VENUE_MAP, p2i
+
+OP_ADD, OP_CANCEL     = pyorderbook.OP_ADD,     pyorderbook.OP_CANCEL
+OP_REPLACE, OP_EXECUTE = pyorderbook.OP_REPLACE, pyorderbook.OP_EXECUTE
+OP_CODE = {"add": OP_ADD, "cancel": OP_CANCEL,
+           "replace": OP_REPLACE, "execute": OP_EXECUTE}
 
 
 class BatchedBookDriver:
     """
-    Batch driver that trusts pyorderbook.OrderBook.on_batch() to return
-    ONLY meaningful payloads (3-tuple for executions, 5-tuple for NBBO
-    improvements).  We publish by inspecting the length.
+    Feed → match → publish pipeline over pyorderbook.OrderRing.
+
+    on_event (feed thread) decodes each event once and pushes it into a
+    lock-free SPSC ring; a pinned C++ match thread pops it, runs the
+    book and pushes ONLY meaningful payloads (4-tuple for executions,
+    5-tuple for NBBO improvements) into a results ring; a publisher
+    thread drains that and publishes by inspecting the length.
+
+    Use as a context manager (or call close()): the threads only stop
+    there.  Idle rings back off to sleeping, so an open driver is cheap.
     """
 
-    def __init__(self, publisher, batch_size: int = 32):
-        self.book        = pyorderbook.OrderBook()
+    def __init__(self, publisher, batch_size: int = 32,
+                 capacity: int = 1 << 16, cpu: int = -1):
         self.publisher   = publisher
-        self.batch       = []
-        self.batch_size  = batch_size
+        self.batch_size  = batch_size             # max results per poll
+        self.ring        = pyorderbook.OrderRing(capacity)
+        self.ring.start(cpu)                      # cpu < 0 → unpinned
 
-    # ---------------- flush ----------------
-    def _flush(self):
-        if not self.batch:
-            return
+        # feed oid (any hashable) → [int64 ring id, open qty]; feed thread only
+        self._ids        = {}
+        self._next_id    = 0
 
-        results = self.book.on_batch(self.batch)  # one C++ call
-        self.batch.clear()
+        self._error      = None                   # publisher exception, re-raised to the feed
+        self._closed     = threading.Event()
+        self._pub        = threading.Thread(target=self._publish_loop,
+                                            name="book-publisher", daemon=True)
+        self._pub.start()
 
+    # ---------------- publish ----------------
+    def _publish(self, results):
         for res in results:
             if len(res) == 4:                     # execution payload
                 exec_px, rem, per_venue, venue_str = res
@@ -42,6 +62,34 @@ class BatchedBookDriver:
                     "old_venues": venue_str,
                 })
 
+    def _publish_loop(self):
+        try:
+            while not self._closed.is_set():
+                self._publish(self.ring.poll(self.batch_size))
+        except Exception as e:
+            self._error = e
+            self.ring.stop()                      # frees a feeder stuck in push
+
+    # ---------------- oid mapping ----------------
+    def _new_id(self, oid, qty):
+        rid = self._next_id
+        self._next_id += 1
+        self._ids[oid] = [rid, qty]
+        return rid
+
+    def _drop_id(self, oid):
+        ent = self._ids.pop(oid, None)
+        return ent[0] if ent else -1              # -1 never issued → no-op
+
+    def _fill_id(self, oid, exec_qty):
+        ent = self._ids.get(oid)
+        if ent is None:
+            return -1
+        ent[1] -= exec_qty                        # mirrors the book's fill
+        if ent[1] <= 0:
+            del self._ids[oid]
+        return ent[0]
+
     # ---------------- public API ----------------
     def on_event(self, evt):
         """
@@ -50,11 +98,55 @@ class BatchedBookDriver:
           ("cancel",  oid)
           ("replace", new_oid, old_oid, venue, side, price, qty)
           ("execute", oid, exec_qty)
+
+        oids may be any hashable; they're mapped to int64 ring ids here
+        and forgotten once cancelled, replaced or fully executed.
+
+        If publisher.publish raised on the publisher thread, the ring is
+        stopped and that exception is raised here instead.
         """
-        self.batch.append(evt)
-        if len(self.batch) >= self.batch_size:
-            self._flush()
+        if self._error is not None:
+            raise self._error
+        try:
+            op = OP_CODE[evt[0]]
+            if op == OP_CANCEL:
+                self.ring.push(op, self._drop_id(evt[1]), 0, 0, False, 0, 0)
+            elif op == OP_EXECUTE:
+                self.ring.push(op, self._fill_id(evt[1], evt[2]), 0, 0, False, 0, evt[2])
+            elif op == OP_REPLACE:
+                _, oid, old_oid, venue, side, price, qty = evt
+                vid = VENUE_MAP[venue]            # KeyError before any id churn
+                old = self._drop_id(old_oid)
+                self.ring.push(op, self._new_id(oid, qty), old, vid,
+                               side == b'BID', p2i(price), qty)
+            else:                                 # add
+                _, oid, venue, side, price, qty = evt
+                vid = VENUE_MAP[venue]
+                self.ring.push(op, self._new_id(oid, qty), 0, vid,
+                               side == b'BID', p2i(price), qty)
+        except RuntimeError:
+            if self._error is not None:           # ring stopped by the publisher
+                raise self._error from None
+            raise
 
     def close(self):
-        """Flush any leftovers at shutdown."""
-        self._flush()
+        """Drain the match thread, then publish whatever is left.
+
+        Raises the publisher's exception if it failed on its thread.
+        """
+        self.ring.stop()                          # returns once events drained
+        self._closed.set()
+        self._pub.join()
+        if self._error is not None:
+            raise self._error
+        while True:
+            results = self.ring.poll(self.batch_size, 0)
+            if not results:
+                break
+            self._publish(results)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,201 @@
+"""
+Ring-driver checks for BatchedBookDriver over pyorderbook.OrderRing.
+
+pyorderbook is (re)built in place via build_ext.ensure() first, so these
+run on a clean checkout.  The reference for every stream is the same
+events through OrderBook.on_batch on a single thread.
+"""
+
+import random
+import threading
+import time
+import types
+
+import numpy as np
+import pytest
+
+import build_ext
+build_ext.ensure()
+import pyorderbook
+
+from orderbook import VENUES, VENUE_MAP, p2i
+from orderbook2 import BatchedBookDriver, OP_ADD, OP_CODE
+
+
+class ListPublisher:
+    def __init__(self, delay=None):
+        self.msgs  = []
+        self.delay = delay                    # Event to wait on before first publish
+
+    def publish(self, msg):
+        if self.delay is not None:
+            self.delay.wait()
+        self.msgs.append(msg)
+
+def reference_msgs(batch):
+    """publish on_batch's payloads the way the driver does"""
+    pub = ListPublisher()
+    res = pyorderbook.OrderBook().on_batch(batch)
+    BatchedBookDriver._publish(types.SimpleNamespace(publisher=pub), res)
+    return pub.msgs
+
+def random_stream(n, seed=7):
+    """(driver events with str oids, on_batch tuples with int oids + ticks)"""
+    rng  = random.Random(seed)
+    live, evts, batch = [], [], []
+    for k in range(n):
+        r = rng.random()
+        if live and r < 0.25:
+            o = live.pop(rng.randrange(len(live)))
+            evts.append(("cancel", f"o{o}"))
+            batch.append(("cancel", o))
+        elif live and r < 0.45:
+            o = rng.choice(live)
+            q = rng.randint(1, 60)
+            evts.append(("execute", f"o{o}", q))
+            batch.append(("execute", o, q))
+        else:
+            venue = rng.choice(VENUES)
+            side  = rng.choice((b'BID', b'ASK'))
+            base  = 2.40 if side == b'BID' else 2.60
+            px    = round(base + rng.choice((-1, 1)) * rng.randint(0, 20) * 0.01, 2)
+            qty   = rng.randint(1, 100)
+            if live and r < 0.65:
+                old = live.pop(rng.randrange(len(live)))
+                evts.append(("replace", f"o{k}", f"o{old}", venue, side, px, qty))
+                batch.append(("replace", k, old, venue, side.decode(), p2i(px), qty))
+            else:
+                evts.append(("add", f"o{k}", venue, side, px, qty))
+                batch.append(("add", k, venue, side.decode(), p2i(px), qty))
+            live.append(k)
+    return evts, batch
+
+def test_driver_matches_on_batch():
+    evts, batch = random_stream(20000)
+    pub = ListPublisher()
+    drv = BatchedBookDriver(pub, batch_size=4, capacity=8)
+    for e in evts:
+        drv.on_event(e)
+    drv.close()
+    want = reference_msgs(batch)
+    assert want, "stream produced no payloads"
+    assert pub.msgs == want
+
+def test_close_drains_both_rings():
+    evts, batch = random_stream(5000, seed=11)
+    gate = threading.Event()
+    pub  = ListPublisher(delay=gate)        # results back up until released
+    drv  = BatchedBookDriver(pub, batch_size=2, capacity=8)
+    feeder = threading.Thread(target=lambda: [drv.on_event(e) for e in evts])
+    feeder.start()
+    feeder.join(0.05)                       # let both rings fill up
+    gate.set()
+    feeder.join()
+    drv.close()
+    assert pub.msgs == reference_msgs(batch)
+
+def test_push_rejects_bad_events():
+    ring = pyorderbook.OrderRing(8)
+    ring.start()
+    try:
+        with pytest.raises(ValueError):
+            ring.push(OP_ADD, 1, 0, len(VENUES), True, 250, 10)
+        with pytest.raises(RuntimeError):
+            ring.push(9, 1, 0, 0, True, 250, 10)
+        # the match thread never saw them and is still serving
+        ring.push(OP_ADD, 1, 0, 0, True, 250, 10)
+        ring.push(OP_ADD, 2, 0, 1, True, 251, 5)
+        [res] = ring.poll(8, 1000)
+    finally:
+        ring.stop()
+    new_px, new_sz, old_px, old_sz, venues = res
+    assert (p2i(new_px), new_sz, p2i(old_px), old_sz) == (251, 5, 250, 10)
+    assert venues == "CBOE"
+
+def soa_columns(batch, stride=1):
+    """on_batch tuples → on_batch_soa columns, each a [::stride] view"""
+    n = len(batch)
+    cols = {k: np.zeros(n * stride, dt) for k, dt in
+            (("op", np.int8), ("oid", np.int64), ("ref", np.int64),
+             ("vid", np.int8), ("side", np.int8), ("tick", np.int32),
+             ("qty", np.int32))}
+    for i, t in enumerate(batch):
+        row = {"op": OP_CODE[t[0]], "oid": t[1]}
+        if t[0] == "execute":
+            row["qty"] = t[2]
+        elif t[0] != "cancel":
+            rest = t[2:] if t[0] == "add" else t[3:]
+            if t[0] == "replace":
+                row["ref"] = t[2]
+            venue, side, row["tick"], row["qty"] = rest
+            row["vid"], row["side"] = VENUE_MAP[venue], side == "BID"
+        for k, x in row.items():
+            cols[k][i * stride] = x
+    return {k: c[::stride] for k, c in cols.items()}, n
+
+@pytest.mark.parametrize("stride", [1, 2])
+def test_batch_soa_matches_on_batch(stride):
+    _, batch = random_stream(5000, seed=3)
+    cols, n = soa_columns(batch, stride)
+    want = pyorderbook.OrderBook().on_batch(batch)
+    ob   = pyorderbook.OrderBook()
+    assert ob.on_batch_soa(n=n, **cols) == want
+    ref = pyorderbook.OrderBook(); ref.on_batch(batch)
+    assert (ob.best_bid_tick(), ob.best_ask_tick()) == \
+           (ref.best_bid_tick(), ref.best_ask_tick())
+
+def test_batch_soa_rejects_whole_batch():
+    cols, n = soa_columns([("add", 1, "CBOE", "BID", 250, 10),
+                           ("add", 2, "ISE",  "BID", 255, 10),
+                           ("add", 3, "BOX",  "BID", 260, 10)])
+    cols["vid"][2] = len(VENUES)
+    ob = pyorderbook.OrderBook()
+    with pytest.raises(ValueError):
+        ob.on_batch_soa(n=n, **cols)
+    assert ob.best_bid_tick() is None, "rows before the bad one were applied"
+
+class Boom(Exception):
+    pass
+
+class RaisingPublisher:
+    def publish(self, msg):
+        raise Boom(msg)
+
+def test_publisher_error_reaches_feed_and_close():
+    evts, _ = random_stream(5000, seed=5)
+    drv = BatchedBookDriver(RaisingPublisher(), batch_size=2, capacity=8)
+    seen = {}
+    def feed():
+        try:
+            for e in evts:
+                drv.on_event(e)
+        except Boom as e:
+            seen["feed"] = e
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    feeder.join(5)
+    assert not feeder.is_alive(), "feeder hung after the publisher died"
+    assert "feed" in seen, "publisher error not raised from on_event"
+    def close():
+        try:
+            drv.close()
+        except Boom as e:
+            seen["close"] = e
+    closer = threading.Thread(target=close, daemon=True)
+    closer.start()
+    closer.join(5)
+    assert not closer.is_alive(), "close() hung after the publisher died"
+    assert "close" in seen, "publisher error not raised from close()"
+
+def test_context_manager_closes_and_idles_cheaply():
+    evts, batch = random_stream(2000, seed=13)
+    pub = ListPublisher()
+    with BatchedBookDriver(pub, batch_size=4, capacity=8) as drv:
+        for e in evts:
+            drv.on_event(e)
+        cpu0 = time.process_time()
+        time.sleep(0.5)                         # idle: both loops back off
+        idle_cpu = time.process_time() - cpu0
+    assert not drv._pub.is_alive(), "publisher thread outlived the block"
+    assert pub.msgs == reference_msgs(batch)
+    assert idle_cpu < 0.25, f"idle driver burned {idle_cpu:.2f}s CPU in 0.5s"
@@ -0,0 +1,60 @@
+#######################################################################
+#  Window kernels  –  bitset scans over uint64 words, numba @njit.
+#  orderbook.py imports this only when the AOT build (orderbook_kernels,
+#  see build_kernels.py) is missing, so numba isn't loaded otherwise;
+#  cache=True → the JIT result is reloaded from __pycache__ next run.
+#  Sizes come from the arrays: bits has one uint64 word per 64 ticks,
+#  coarse one 10-bit mask per ``stride``-tick bucket.
+#######################################################################
+import numpy as np
+from numba import njit
+
+_ONE = np.uint64(1)
+
+@njit(cache=True)
+def _msb(w):
+    """index of highest set bit of a nonzero uint64"""
+    n = 0
+    while w > _ONE:
+        w >>= _ONE; n += 1
+    return n
+
+@njit(cache=True)
+def _lsb(w):
+    """index of lowest set bit of a nonzero uint64"""
+    n = 0
+    while not (w & _ONE):
+        w >>= _ONE; n += 1
+    return n
+
+@njit(cache=True)
+def best_after_dec(bits, is_bid, rel):
+    """rel of nearest set tick below (bid) / above (ask) rel, or -1"""
+    nwords = len(bits)
+    if is_bid:
+        w = rel >> 6
+        if w < nwords:
+            m = bits[w] & ((_ONE << np.uint64(rel & 63)) - _ONE)
+            if m: return (w << 6) + _msb(m)
+        for k in range(min(w, nwords) - 1, -1, -1):
+            if bits[k]: return (k << 6) + _msb(bits[k])
+    else:
+        r = rel + 1
+        w = r >> 6
+        if w < nwords:
+            m = bits[w] & ~((_ONE << np.uint64(r & 63)) - _ONE)
+            if m: return (w << 6) + _lsb(m)
+            for k in range(w + 1, nwords):
+                if bits[k]: return (k << 6) + _lsb(bits[k])
+    return -1
+
+@njit(cache=True)
+def best_in_coarse(coarse, is_bid, stride):
+    """rel (in ticks) of best set tick in the coarse window, or -1"""
+    if is_bid:
+        for b in range(len(coarse) - 1, -1, -1):
+            if coarse[b]: return b * stride + _msb(np.uint64(coarse[b]))
+    else:
+        for b in range(len(coarse)):
+            if coarse[b]: return b * stride + _lsb(np.uint64(coarse[b]))
+    return -1
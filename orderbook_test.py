@@ -3,9 +3,10 @@ Quick sanity-tests for the dense-window+heap OrderBook.
 
 Assumptions
 -----------
-* OrderBook, PriceLevel, p2i/i2p helpers are in the same directory
+* OrderBook, p2i/i2p helpers are in the same directory
   (or pip-installable package path).
-* 'on_execute' is a no-op for now (per user note).
+* 'on_execute' fills against the order's open qty (partial fills
+  keep the order, a full fill drops it).
 
 This is **not** a full unit-suite—just smoke checks that the
 best-price cursor and NBBO-improvement tuple behave the same
@@ -34,6 +35,15 @@ def test_bid_improvement():
     assert "CBOE" in old_exchs, "old venue list missing CBOE"
     assert_eq(round(ob.best_bid(), 2), 2.55, "best bid not updated")
 
+def test_worse_level_no_improvement():
+    ob = OrderBook()
+    ob.on_add("b1", "CBOE", b'BID', 2.50, 100)
+    ob.on_add("a1", "CBOE", b'ASK', 2.80, 100)
+    # new but worse levels must not report an NBBO jump
+    assert_eq(ob.on_add("b2", "ISE", b'BID', 2.40, 10), None, "worse bid")
+    assert_eq(ob.on_add("a2", "ISE", b'ASK', 2.90, 10), None, "worse ask")
+    assert_eq((ob.best_bid_tick(), ob.best_ask_tick()), (250, 280))
+
 def test_cancel_drops_best():
     ob = OrderBook()
     ob.on_add("b1", "CBOE", b'BID', 2.50, 50)
@@ -48,6 +58,8 @@ def test_ask_side():
     ob.on_add("a1", "CBOE", b'ASK', 2.80, 40)
     ob.on_add("a2", "ARCA", b'ASK', 2.75, 20)   # better offer
     assert_eq(ob.best_ask(), 2.75)
+    assert_eq(ob.best_ask_tick(), 275)
+    assert_eq(ob.best_bid_tick(), None)
 
 def test_replace_atomic():
     ob = OrderBook()
@@ -59,6 +71,17 @@ def test_replace_atomic():
     # ensure best now 2.60
     assert_eq(ob.best_bid(), 2.60)
 
+def test_replace_in_place():
+    ob = OrderBook()
+    ob.on_add("x1", "CBOE", b'BID', 2.50, 100)
+    ob.on_add("y1", "ISE",  b'BID', 2.50, 10)
+    # same tick & venue → resize only, no NBBO tuple
+    assert_eq(ob.on_replace("x2", "x1", "CBOE", b'BID', 2.50, 40), None)
+    assert "x1" not in ob.oid_slot and "x2" in ob.oid_slot
+    ret = ob.on_add("z1", "BOX", b'BID', 2.55, 5)
+    assert_eq(ret[3], 50, "level size after in-place shrink")
+    assert_eq(sorted(ret[4]), ["CBOE", "ISE"])
+
 def test_heap_fallback():
     """
     Add a price 30 dollars away so it's outside the ±$5 window.
@@ -94,6 +117,89 @@ def test_heap_fallback2():
     print(ob.best_bid())     
     assert_eq(ob.best_bid(), -32.50, "best should fall back to near price")
 
+def test_far_cancel_prefers_window():
+    """
+    Cancel a far best bid while both a window tick and a lower far
+    tick remain: the window tick must win, not the next far one.
+    """
+    ob = OrderBook()
+    ob.on_add("near", "CBOE", b'BID', 2.50, 10)
+    ob.on_add("lo",   "ISE",  b'BID', -32.50, 5)
+    ob.on_add("hi",   "ISE",  b'BID', 32.50, 5)
+    ob.on_add("vfar", "BOX",  b'BID', 90.00, 5)         # beyond coarse
+
+    ob.on_cancel("vfar")
+    assert_eq(ob.best_bid(), 32.50, "coarse tick should follow heap tick")
+    ob.on_cancel("hi")
+    assert_eq(ob.best_bid(), 2.50, "window tick should beat lower far tick")
+
+def test_far_readd_after_cancel():
+    """A far price cancelled then re-added must not stay tombstoned."""
+    ob = OrderBook()
+    ob.on_add("near", "CBOE", b'BID', 2.50, 10)
+    ob.on_add("f1",   "ISE",  b'BID', 90.00, 5)
+    ob.on_cancel("f1")
+    ob.on_add("f2",   "ISE",  b'BID', 90.00, 5)
+    assert_eq(ob.best_bid(), 90.00, "re-added far price lost")
+    ob.on_cancel("f2")
+    assert_eq(ob.best_bid(), 2.50, "stale heap copy revived")
+
+def test_negative_tick_after_empty_side():
+    """-1 used to be the empty-bid sentinel; ticks ≤ -1 must still count."""
+    ob = OrderBook()
+    ob.on_add("b1", "CBOE", b'BID', 2.50, 10)
+    ob.on_cancel("b1")
+    assert_eq(ob.best_bid(), None, "emptied side should have no best")
+    ob.on_add("b2", "ISE", b'BID', -0.01, 10)
+    assert_eq(ob.best_bid(), -0.01, "negative tick ignored on empty side")
+
+def test_execute_drains_level():
+    ob = OrderBook()
+    ob.on_add("b1", "CBOE", b'BID', 2.50, 30)
+    ob.on_add("b2", "ISE",  b'BID', 2.55, 20)
+    ob.on_add("b3", "BOX",  b'BID', 2.55, 5)
+
+    ob.on_execute("b2", 20)                    # BOX still rests @ 2.55
+    assert_eq(round(ob.best_bid(), 2), 2.55, "partial level dropped")
+    ob.on_execute("b3", 10)                    # over-fill clamps to 5
+    assert_eq(ob.best_bid(), 2.50, "drained level still best")
+    assert "b3" not in ob.oid_slot, "filled order left in oid_slot"
+
+def test_order_slab_reuse_and_grow():
+    import orderbook
+    saved, orderbook.MAX_ORDERS = orderbook.MAX_ORDERS, 2
+    try:
+        ob = OrderBook()
+        for i in range(5):                       # forces two doublings
+            ob.on_add(f"o{i}", "CBOE", b'BID', 2.50 + i / 100, 10)
+        assert_eq(len(ob.qty_arr), 8, "slab did not grow")
+        ob.on_cancel("o4")
+        ob.on_add("o5", "ISE", b'ASK', 3.00, 7)  # reuses o4's slot
+        assert_eq(ob.oid_slot["o5"], 4, "freed slot not reused")
+        assert_eq(round(ob.best_bid(), 2), 2.53)
+        assert_eq(ob.best_ask(), 3.00)
+    finally:
+        orderbook.MAX_ORDERS = saved
+
+def test_venue_size_overflow_asserts():
+    ob = OrderBook()
+    ob.on_add("b1", "CBOE", b'BID', 2.50, 60000)
+    try:
+        ob.on_add("b2", "CBOE", b'BID', 2.50, 6000)
+    except AssertionError:
+        assert __debug__, "overflow asserted under -O"
+        return
+    # python -O: venue cell saturates, aggregate keeps the true size
+    assert not __debug__, "per-venue overflow not caught"
+    assert_eq(int(ob.book[500, 1, 0]), 65535, "venue size should saturate")
+    assert_eq(int(ob.agg[500, 1]), 66000, "aggregate size")
+
+def test_side_storage_aligned():
+    ob = OrderBook()
+    for name in ("book", "agg"):
+        assert_eq(getattr(ob, name).ctypes.data % 64, 0, f"{name} not 64B-aligned")
+    assert_eq(ob.book[0].nbytes, 64, "bid+ask of a tick should fill one line")
+
 def run_all():
     for fn in globals().values():
         if callable(fn) and fn.__name__.startswith("test_"):